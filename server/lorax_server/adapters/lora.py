@@ -13,6 +13,7 @@ from lorax_server.utils.lora import LM_HEAD
 from lorax_server.utils.sgmv import (
     BGMV_MAX_RANK,
     MAX_RANK_CUSTOM,
+    MIN_RANK_CUSTOM,
     get_tmp_tensors,
     orient_for_rank,
     pad_rank,
@@ -156,9 +157,9 @@ class LoraWeights(AdapterWeights):
         lora_a_list = [None] * nlayers
         lora_b_list = [None] * nlayers
 
+        targets = model.target_to_layer_by_type[layer_type]
         for layer_id in range(nlayers):
-            key = (layer_id, layer_type)
-            weight_name, layer = model.target_to_layer[key]
+            weight_name, layer = targets[layer_id]
 
             base_weight = layer.base_layer.linear.weight
             base_device = base_weight.device
@@ -260,7 +261,13 @@ class BatchLoraWeights(BatchAdapterWeights):
         device = first_weights.weights_a.device
         segment_indices = meta.segment_indices
 
-        lora_a = {idx: adapter_weights[idx].weights_a for idx in segment_indices if idx in adapter_weights}
+        # The fallback path in `forward_lora` multiplies by each layer's A matrix directly, so orient the stacked
+        # weights once per batch here rather than once per layer call
+        lora_a = {
+            idx: _orient_layers_for_rank(adapter_weights[idx].weights_a, adapter_weights[idx].lora_b_r)
+            for idx in segment_indices
+            if idx in adapter_weights
+        }
         lora_b = {idx: adapter_weights[idx].weights_b for idx in segment_indices if idx in adapter_weights}
 
         segment_ranks = [adapter_weights[idx].lora_a_r for idx in segment_indices if idx in adapter_weights]
@@ -388,6 +395,13 @@ class BatchLoraWeights(BatchAdapterWeights):
         )
 
 
+def _orient_layers_for_rank(t: torch.Tensor, rank: int) -> torch.Tensor:
+    """Applies `orient_for_rank` to every layer of a stacked [num_layers, ...] tensor."""
+    if MIN_RANK_CUSTOM <= rank <= MAX_RANK_CUSTOM:
+        return t.transpose(1, 2)
+    return t
+
+
 def get_scaling_factor(
     lora_alpha: int,
     r: int,
@@ -42,6 +42,8 @@ class Linear8bitLt(torch.nn.Module):
         )
         self.weight.cuda(weight.device)
         self.bias = bias
+        # Set after the first forward, once the 8-bit state is built and the bias has the activation dtype
+        self._initialized_dtype = None
 
     def init_8bit_state(self):
         self.state.CB = self.weight.CB
@@ -50,6 +52,9 @@ class Linear8bitLt(torch.nn.Module):
         self.weight.SCB = None
 
     def forward(self, x: torch.Tensor):
+        if self._initialized_dtype == x.dtype:
+            return bnb.matmul(x, self.weight, bias=self.bias, state=self.state)
+
         self.state.is_training = self.training
         if self.weight.CB is not None:
             self.init_8bit_state()
@@ -66,6 +71,9 @@ class Linear8bitLt(torch.nn.Module):
                 # we no longer need the row-major weight
                 del self.state.CB
                 self.weight.data = self.state.CxB
+
+        # Any weight layout conversion happens in the first pass, so later calls only need the matmul
+        self._initialized_dtype = x.dtype
         return out
 
 
@@ -80,6 +88,8 @@ class Linear4bit(torch.nn.Module):
         )
         self.compute_dtype = None
         self.weight.cuda(weight.device)
+        # Transpose the packed weight once here rather than on every forward
+        self.weight_t = self.weight.t()
         self.bias = bias
 
     def forward(self, x: torch.Tensor):
@@ -92,11 +102,13 @@ class Linear4bit(torch.nn.Module):
                 "FP4 quantization state not initialized. Please call .cuda() or .to(device) on the LinearFP4 layer first."
             )
         inp_dtype = x.dtype
+        bias = self.bias
         if self.compute_dtype is not None:
             x = x.to(self.compute_dtype)
+            if bias is not None:
+                bias = bias.to(self.compute_dtype)
 
-        bias = None if self.bias is None else self.bias.to(self.compute_dtype)
-        out = bnb.matmul_4bit(x, self.weight.t(), bias=bias, quant_state=self.weight.quant_state)
+        out = bnb.matmul_4bit(x, self.weight_t, bias=bias, quant_state=self.weight.quant_state)
 
         out = out.to(inp_dtype)
 
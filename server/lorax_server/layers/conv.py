@@ -14,8 +14,8 @@ def load_conv2d(cls, prefix, weights, in_channels, out_channels, kernel_size, st
             stride=stride,
         )
 
-    conv2d.weight = torch.nn.Parameter(weight)
-    conv2d.bias = torch.nn.Parameter(bias)
+    conv2d.weight = torch.nn.Parameter(weight, requires_grad=False)
+    conv2d.bias = torch.nn.Parameter(bias, requires_grad=False)
     return conv2d
 
 
@@ -30,7 +30,7 @@ def load_conv2d_no_bias(cls, prefix, weights, in_channels, out_channels, kernel_
             stride=stride,
         )
 
-    conv2d.weight = torch.nn.Parameter(weight)
+    conv2d.weight = torch.nn.Parameter(weight, requires_grad=False)
     conv2d.bias = None
     return conv2d
 
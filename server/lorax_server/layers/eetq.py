@@ -12,11 +12,13 @@ class EETQLinear(torch.nn.Module):
         device = weight.device
         if weight.dtype != torch.float16:
             weight = weight.to(dtype=torch.float16)
+        # EETQ quantizes on the CPU, so copy the results back through pinned memory without blocking.
+        # The upload of this layer then overlaps with the CPU quantization of the next one.
         weight = torch.t(weight).contiguous().cpu()
         weight, scale = quant_weights(weight, torch.int8, False)
 
-        self.weight = weight.cuda(device)
-        self.scale = scale.cuda(device)
+        self.weight = weight.pin_memory().to(device, non_blocking=True)
+        self.scale = scale.pin_memory().to(device, non_blocking=True)
         self.bias = bias.cuda(device) if bias is not None else None
 
     def forward(self, input: torch.Tensor) -> torch.Tensor:
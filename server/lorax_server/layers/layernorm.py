@@ -15,8 +15,8 @@ def load_layer_norm(cls, prefix, weights, eps):
     with init_empty_weights():
         ln = cls(weight.shape, eps=eps)
 
-    ln.weight = torch.nn.Parameter(weight)
-    ln.bias = torch.nn.Parameter(bias)
+    ln.weight = torch.nn.Parameter(weight, requires_grad=False)
+    ln.bias = torch.nn.Parameter(bias, requires_grad=False)
     return ln
 
 
@@ -26,7 +26,7 @@ def load_layer_norm_no_bias(cls, prefix, weights, eps):
     with init_empty_weights():
         ln = cls(weight.shape, eps=eps)
 
-    ln.weight = torch.nn.Parameter(weight)
+    ln.weight = torch.nn.Parameter(weight, requires_grad=False)
     ln.bias = None
     return ln
 
@@ -38,39 +38,45 @@ if SYSTEM == "cuda":
     import dropout_layer_norm
 
     class FastLayerNorm(nn.LayerNorm):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            # The fused kernel only supports hidden sizes up to 8192, which is fixed once the layer is built
+            if self.normalized_shape[-1] > 8192:
+                self.forward = self._forward_unfused
+
+        def _forward_unfused(self, hidden_states, residual=None):
+            if residual is not None:
+                hidden_states += residual
+            residual = hidden_states
+
+            return super(FastLayerNorm, self).forward(hidden_states), residual
+
         def forward(self, hidden_states, residual=None):
-            if hidden_states.shape[-1] > 8192:
-                if residual is not None:
-                    hidden_states += residual
+            (
+                normed_hidden_states,
+                residual,
+                *rest,
+            ) = dropout_layer_norm.dropout_add_ln_fwd(
+                hidden_states,
+                residual,
+                self.weight,
+                self.bias,
+                None,
+                None,
+                None,
+                None,
+                0.0,
+                self.eps,
+                1.0,
+                0,
+                None,
+                False,
+                False,
+            )
+            if residual is None:
                 residual = hidden_states
 
-                return super(FastLayerNorm, self).forward(hidden_states), residual
-            else:
-                (
-                    normed_hidden_states,
-                    residual,
-                    *rest,
-                ) = dropout_layer_norm.dropout_add_ln_fwd(
-                    hidden_states,
-                    residual,
-                    self.weight,
-                    self.bias,
-                    None,
-                    None,
-                    None,
-                    None,
-                    0.0,
-                    self.eps,
-                    1.0,
-                    0,
-                    None,
-                    False,
-                    False,
-                )
-                if residual is None:
-                    residual = hidden_states
-
-                return normed_hidden_states, residual
+            return normed_hidden_states, residual
 
 elif SYSTEM == "rocm":
     from vllm._C import ops
@@ -99,7 +105,7 @@ class FastRMSNorm(nn.Module):
     def __init__(self, weight: torch.Tensor, eps: float):
         super().__init__()
 
-        self.weight = nn.Parameter(weight)
+        self.weight = nn.Parameter(weight, requires_grad=False)
         self.variance_epsilon = eps
 
     @classmethod
@@ -44,9 +44,9 @@ class FastLinearROCm(torch.nn.Module):
         bias,
     ) -> None:
         super().__init__()
-        self.weight = torch.nn.Parameter(weight)
+        self.weight = torch.nn.Parameter(weight, requires_grad=False)
         if bias is not None:
-            self.bias = torch.nn.Parameter(bias)
+            self.bias = torch.nn.Parameter(bias, requires_grad=False)
         else:
             self.bias = None
 
@@ -112,7 +112,7 @@ def get_linear(weight, bias, quantize, fan_in_fan_out=False, weight_scale=None,
             threshold=6.0,
         )
         if bias is not None:
-            linear.bias = nn.Parameter(bias)
+            linear.bias = nn.Parameter(bias, requires_grad=False)
     elif quantize == "bitsandbytes-nf4":
         from lorax_server.layers.bnb import Linear4bit
 
@@ -6,6 +6,13 @@ from torch.nn import functional as F
 from lorax_server.layers.linear import FastLinear, get_linear
 
 
+@torch.jit.script
+def remap_embedding_ids(input: torch.Tensor, min_id: int, span: int, null_idx: int) -> torch.Tensor:
+    # Shift ids into [0, span) for this shard and send everything outside of it to the zeroed null row
+    shifted = input - min_id
+    return shifted.masked_fill((shifted < 0) | (shifted >= span), null_idx)
+
+
 class SuperLayer(torch.nn.Module):
     def __init__(self, linear):
         super().__init__()
@@ -72,11 +79,11 @@ class TensorParallelHead(SuperLayer):
                 return world_out
             return world_out.T
 
-        output = super().forward(input)
-        world_output = [torch.empty_like(output) for _ in range(self.process_group.size())]
-        torch.distributed.all_gather(world_output, output, group=self.process_group)
-        world_output = torch.cat(world_output, dim=-1)
-        return world_output
+        output = super().forward(input).contiguous()
+        # Gather every shard into one buffer, then move the shard dim next to the vocab dim to concatenate them
+        world_output = output.new_empty(world_size, *output.shape)
+        torch.distributed.all_gather_into_tensor(world_output, output, group=self.process_group)
+        return world_output.movedim(0, -2).reshape(*output.shape[:-1], -1)
 
 
 class TensorParallelColumnLinear(SuperLayer):
@@ -171,21 +178,18 @@ class TensorParallelEmbedding(torch.nn.Module):
         block_size = (num_embeddings + world_size - 1) // world_size
         self.min_id = rank * block_size
         self.max_id = min(num_embeddings, (rank + 1) * block_size)
+        self.span = self.max_id - self.min_id
         self.null_idx = weight.shape[0]  # Usually block_size, might be less in non even vocab_size.
         self.process_group = weights.process_group
         self.reduce = reduce
 
         """Additional 0 entry used for masking"""
-        self.weight = torch.nn.Parameter(F.pad(weight, (0, 0, 0, 1)))
+        self.weight = torch.nn.Parameter(F.pad(weight, (0, 0, 0, 1)), requires_grad=False)
 
     def forward(self, input: torch.Tensor) -> torch.Tensor:
         # default all out of bounds values to `self.null_idx` that will then be mapped to 0
         # translate for [0, self.max_id - self.min_id[
-        input = torch.where(
-            (self.min_id > input) | (input >= self.max_id),
-            self.null_idx,
-            input - self.min_id,
-        )
+        input = remap_embedding_ids(input, self.min_id, self.span, self.null_idx)
         out = torch.nn.functional.embedding(input, self.weight)
         if self.reduce and self.process_group.size() > 1:
             torch.distributed.all_reduce(out, group=self.process_group)
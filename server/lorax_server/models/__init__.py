@@ -76,7 +76,9 @@ def get_model(
 
     model_type = config_dict["model_type"]
     is_dtype_provided = dtype is not None
-    dtype = dtype or config_dict.get("torch_dtype", "float16")
+    # Embedding models do not generate, so prefer the wider range of bf16 when the checkpoint doesn't specify a dtype
+    default_dtype = "bfloat16" if embedding_dim is not None and is_bf16_supported() else "float16"
+    dtype = dtype or config_dict.get("torch_dtype", default_dtype)
 
     if dtype in {"float16", "float32"}:
         dtype = torch.float16
@@ -109,7 +111,7 @@ def get_model(
 
         if config_dict["architectures"][0] == "BertForTokenClassification":
             return FlashBert(model_id, revision=revision, dtype=dtype, classifcation_head=True)
-        return FlashBert(model_id, revision=revision, dtype=dtype)
+        return FlashBert(model_id, revision=revision, dtype=dtype, compile=compile)
 
     if model_type == "distilbert":
         from lorax_server.models.flash_distilbert import FlashDistilBert
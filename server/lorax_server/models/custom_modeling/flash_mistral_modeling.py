@@ -412,7 +412,8 @@ class MistralMLP(nn.Module):
     def forward(self, hidden_states, adapter_data):
         gate_up_states = self.gate_up_proj(hidden_states, adapter_data)
         gate_up_states = gate_up_states.view(-1, 2, self.intermediate_size)
-        return self.down_proj(self.act(gate_up_states[:, 0]) * gate_up_states[:, 1], adapter_data)
+        # Multiply in place into the activation output to avoid materializing a second intermediate
+        return self.down_proj(self.act(gate_up_states[:, 0]).mul_(gate_up_states[:, 1]), adapter_data)
 
 
 class MistralLayer(nn.Module):
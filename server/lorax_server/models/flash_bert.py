@@ -1,5 +1,5 @@
 from contextlib import nullcontext
-from typing import Any, ContextManager, Optional, Type
+from typing import Any, ContextManager, Dict, List, Optional, Type
 
 import torch
 from opentelemetry import trace
@@ -19,6 +19,9 @@ from lorax_server.utils.state import FLASH_INFER
 
 tracer = trace.get_tracer(__name__)
 
+# Number of tokens each single-sequence embedding graph is padded to
+EMBEDDING_GRAPH_NUM_TOKENS = [16, 32, 64, 128, 256, 512, 1024]
+
 
 def _format_prefix(prefix, name):
     if prefix is None:
@@ -70,6 +73,82 @@ class FlashBertModelForClassification(torch.nn.Module):
         return logits
 
 
+def get_graph_num_tokens(max_position_embeddings: int) -> List[int]:
+    """Graph sizes the model can trace, as every position of a traced graph must exist in the position embeddings."""
+    return [num_tokens for num_tokens in EMBEDDING_GRAPH_NUM_TOKENS if num_tokens <= max_position_embeddings]
+
+
+def get_cached_num_tokens(num_tokens: int, graph_num_tokens: List[int]) -> Optional[int]:
+    for cached_num_tokens in graph_num_tokens:
+        if num_tokens <= cached_num_tokens:
+            return cached_num_tokens
+    # Larger inputs run eagerly
+    return None
+
+
+class EmbeddingGraphWrapper:
+    """CUDA graph of a single-sequence embedding forward, padded to a fixed number of tokens.
+
+    Position ids are a constant arange and only the upper bound of `cu_seqlens` changes between replays,
+    so the padded tokens are never attended to and the pooled output only depends on the real tokens.
+    """
+
+    def __init__(
+        self,
+        graph: torch.cuda.CUDAGraph,
+        memory_pool: Any,
+        input_ids: torch.Tensor,
+        token_type_ids: torch.Tensor,
+        cu_seqlens: torch.Tensor,
+        output_states: torch.Tensor,
+    ):
+        self.graph = graph
+        self.memory_pool = memory_pool
+        self.input_ids = input_ids
+        self.token_type_ids = token_type_ids
+        self.cu_seqlens = cu_seqlens
+        self.output_states = output_states
+
+    @staticmethod
+    def trace(
+        model: torch.nn.Module,
+        device: torch.device,
+        num_tokens: int,
+        memory_pool: Any,
+    ) -> "EmbeddingGraphWrapper":
+        input_ids = torch.zeros(num_tokens, dtype=torch.int32, device=device)
+        token_type_ids = torch.zeros(num_tokens, dtype=torch.int32, device=device)
+        position_ids = torch.arange(num_tokens, dtype=torch.int32, device=device)
+        cu_seqlens = torch.tensor([0, num_tokens], dtype=torch.int32, device=device)
+
+        def _forward():
+            return model.forward(
+                input_ids=input_ids,
+                token_type_ids=token_type_ids,
+                position_ids=position_ids,
+                cu_seqlens=cu_seqlens,
+                max_s=num_tokens,
+            )
+
+        # Run once outside the graph so any lazy initialization is not captured
+        _forward()
+        torch.cuda.synchronize(device)
+
+        graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(graph, pool=memory_pool):
+            output_states = _forward()
+
+        return EmbeddingGraphWrapper(graph, graph.pool(), input_ids, token_type_ids, cu_seqlens, output_states)
+
+    def forward(self, batch: FlashEmbeddingClassificationBatch) -> torch.Tensor:
+        num_tokens = batch.input_ids.shape[0]
+        self.input_ids[:num_tokens].copy_(batch.input_ids)
+        self.token_type_ids[:num_tokens].copy_(batch.token_type_ids)
+        self.cu_seqlens[1:].copy_(batch.cu_seqlens[1:])
+        self.graph.replay()
+        return self.output_states
+
+
 class FlashBert(Model):
     def __init__(
         self,
@@ -77,6 +156,7 @@ class FlashBert(Model):
         revision: Optional[str] = None,
         dtype: Optional[torch.dtype] = None,
         classifcation_head: bool = False,
+        compile: bool = False,
     ):
         self.process_group, rank, world_size = initialize_torch_distributed()
         if torch.cuda.is_available():
@@ -108,6 +188,10 @@ class FlashBert(Model):
             model = FlashBertModel(prefix, weights, device, dtype, config)
 
         self.classification_head_enabled = classifcation_head
+        # Graphs are only captured for the embedding head, where the output shape does not depend on max_s
+        self.compile = compile and not classifcation_head and not FLASH_INFER
+        self.graph_num_tokens = get_graph_num_tokens(config.max_position_embeddings)
+        self.graph_cache: Dict[int, EmbeddingGraphWrapper] = {}
         self.hidden_size = config.hidden_size
         self.config = config
 
@@ -151,6 +235,15 @@ class FlashBert(Model):
         # Note: This is meant to 1) preallocate the memory by doing a forward pass
         # and then just returning the max seqlen since for embeddings we are never generating
         _ = self.embed(batch)
+
+        if self.compile:
+            # Trace from the largest size down so the smaller graphs can reuse the shared memory pool
+            pool = None
+            for num_tokens in reversed(self.graph_num_tokens):
+                graph = EmbeddingGraphWrapper.trace(self.model, self.device, num_tokens, pool)
+                self.graph_cache[num_tokens] = graph
+                pool = graph.memory_pool
+
         return batch.max_s
 
     def generate_token(self, batch: FlashEmbeddingClassificationBatch) -> None:
@@ -182,14 +275,22 @@ class FlashBert(Model):
 
     @tracer.start_as_current_span("embed")
     def embed(self, batch: FlashEmbeddingClassificationBatch) -> Embedding:
-        with self._forward_context(cu_seqlens=batch.cu_seqlens):
-            embedding: torch.Tensor = self.model.forward(
-                input_ids=batch.input_ids,
-                token_type_ids=batch.token_type_ids,
-                position_ids=batch.position_ids,
-                cu_seqlens=batch.cu_seqlens,
-                max_s=batch.max_s,
-            )
+        graph = None
+        if batch.size == 1:
+            cached_num_tokens = get_cached_num_tokens(batch.input_ids.shape[0], self.graph_num_tokens)
+            graph = self.graph_cache.get(cached_num_tokens)
+
+        if graph is not None:
+            embedding: torch.Tensor = graph.forward(batch)
+        else:
+            with self._forward_context(cu_seqlens=batch.cu_seqlens):
+                embedding: torch.Tensor = self.model.forward(
+                    input_ids=batch.input_ids,
+                    token_type_ids=batch.token_type_ids,
+                    position_ids=batch.position_ids,
+                    cu_seqlens=batch.cu_seqlens,
+                    max_s=batch.max_s,
+                )
         embedding = embedding.reshape(embedding.shape[0], -1)[:, : self.hidden_size]
 
         cpu_results = embedding.cpu().tolist()
@@ -46,6 +46,11 @@ SLIDING_WINDOW_BLOCKS: Optional[int] = None
 tracer = trace.get_tracer(__name__)
 
 
+def _to_device_tensor(values, dtype: np.dtype, device: torch.device) -> torch.Tensor:
+    # Build the host array directly at the target dtype from numpy, then issue a single async copy to the device
+    return torch.from_numpy(np.asarray(values, dtype=dtype)).to(device, non_blocking=True)
+
+
 @dataclass
 class FlashCausalLMBatch(Batch):
     batch_id: int
@@ -327,7 +332,7 @@ class FlashCausalLMBatch(Batch):
             all_input_ids_tensor[i, : len(input_ids)] = input_ids
 
         # Create tensors on device
-        all_input_ids_tensor = torch.tensor(all_input_ids_tensor, dtype=torch.int64, device=device)
+        all_input_ids_tensor = torch.from_numpy(all_input_ids_tensor).to(device, non_blocking=True)
 
         if len(pb.requests) > 1:
             input_ids = np.concatenate(all_input_ids, dtype=np.int64)
@@ -342,17 +347,17 @@ class FlashCausalLMBatch(Batch):
             if SLIDING_WINDOW is not None:
                 prefill_cache_indices = prefill_cache_indices[0]
 
-        cu_seqlen_prefill = torch.tensor(cu_seqlen_prefill, device=device, dtype=torch.int32)
+        cu_seqlen_prefill = _to_device_tensor(cu_seqlen_prefill, np.int32, device)
 
         position_ids = position_ids.to(device)
         slot_indices = slot_indices.to(device)
         if SLIDING_WINDOW is not None:
             prefill_cache_indices = prefill_cache_indices.to(device)
-        input_ids = torch.tensor(input_ids, dtype=torch.int64, device=device)
-        input_lengths_tensor = torch.tensor(input_lengths, dtype=torch.int32, device=device)
+        input_ids = _to_device_tensor(input_ids, np.int64, device)
+        input_lengths_tensor = _to_device_tensor(input_lengths, np.int32, device)
 
         adapter_segments, adapter_segment_indices = find_segments(adapter_indices)
-        adapter_segments = torch.tensor(adapter_segments, dtype=torch.int32, device=device)
+        adapter_segments = _to_device_tensor(adapter_segments, np.int32, device)
 
         if all_prefill_logprobs:
             prefill_head_indices = None
@@ -362,14 +367,14 @@ class FlashCausalLMBatch(Batch):
             prefill_next_token_indices = None
         else:
             prefill_head_indices = torch.tensor(torch.cat(prefill_head_indices), dtype=torch.int64, device=device)
-            prefill_next_token_indices = torch.tensor(prefill_next_token_indices, dtype=torch.int64, device=device)
+            prefill_next_token_indices = _to_device_tensor(prefill_next_token_indices, np.int64, device)
 
-        slots = torch.tensor(slots, dtype=torch.int64, device=device)
+        slots = _to_device_tensor(slots, np.int64, device)
         block_tables_tensor = torch.zeros((len(block_tables), max_blocks), dtype=torch.int32, device="cpu")
         for i, request_blocks in enumerate(block_tables):
             block_tables_tensor[i, : len(request_blocks)] = torch.tensor(request_blocks)
         block_tables_tensor = block_tables_tensor.to(device)
-        prefix_lens_tensor = torch.tensor(prefix_lens, dtype=torch.int32, device=device)
+        prefix_lens_tensor = _to_device_tensor(prefix_lens, np.int32, device)
 
         return cls(
             batch_id=pb.id,
@@ -812,7 +817,7 @@ class FlashCausalLM(Model):
         config = config_cls.from_pretrained(model_id, revision=revision, trust_remote_code=trust_remote_code)
         config.quantize = quantize
 
-        torch.distributed.barrier(group=self.process_group)
+        torch.distributed.barrier(group=self.process_group, device_ids=[device.index])
 
         filenames = weight_files(model_id, revision=revision, extension=".safetensors", embedding_dim=embedding_dim)
         merged_weight_filenames = None
@@ -848,8 +853,6 @@ class FlashCausalLM(Model):
         prefix = ""
         model = model_cls(prefix, config, weights)
 
-        torch.distributed.barrier(group=self.process_group)
-
         # VLM models define the config we care about in their text_config
         text_config = getattr(config, "text_config", None)
         if text_config is not None:
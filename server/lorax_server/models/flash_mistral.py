@@ -56,23 +56,19 @@ class FlashMistral(FlashCausalLM):
 
         prefix = "model.layers"
         for i, layer in enumerate(self.model.model.layers):
-            layer_weights[(i, Q_PROJ)] = (
-                f"{prefix}.{i}.self_attn.q_proj",
-                layer.self_attn.query_key_value,
-            )
-            layer_weights[(i, K_PROJ)] = (
-                f"{prefix}.{i}.self_attn.k_proj",
-                layer.self_attn.query_key_value,
-            )
-            layer_weights[(i, V_PROJ)] = (
-                f"{prefix}.{i}.self_attn.v_proj",
-                layer.self_attn.query_key_value,
-            )
-            layer_weights[(i, O_PROJ)] = (f"{prefix}.{i}.self_attn.o_proj", layer.self_attn.o_proj)
-
-            layer_weights[(i, GATE_PROJ)] = (f"{prefix}.{i}.mlp.gate_proj", layer.mlp.gate_up_proj)
-            layer_weights[(i, UP_PROJ)] = (f"{prefix}.{i}.mlp.up_proj", layer.mlp.gate_up_proj)
-            layer_weights[(i, DOWN_PROJ)] = (f"{prefix}.{i}.mlp.down_proj", layer.mlp.down_proj)
+            attn_prefix = f"{prefix}.{i}.self_attn"
+            mlp_prefix = f"{prefix}.{i}.mlp"
+            qkv = layer.self_attn.query_key_value
+            gate_up = layer.mlp.gate_up_proj
+
+            layer_weights[(i, Q_PROJ)] = (f"{attn_prefix}.q_proj", qkv)
+            layer_weights[(i, K_PROJ)] = (f"{attn_prefix}.k_proj", qkv)
+            layer_weights[(i, V_PROJ)] = (f"{attn_prefix}.v_proj", qkv)
+            layer_weights[(i, O_PROJ)] = (f"{attn_prefix}.o_proj", layer.self_attn.o_proj)
+
+            layer_weights[(i, GATE_PROJ)] = (f"{mlp_prefix}.gate_proj", gate_up)
+            layer_weights[(i, UP_PROJ)] = (f"{mlp_prefix}.up_proj", gate_up)
+            layer_weights[(i, DOWN_PROJ)] = (f"{mlp_prefix}.down_proj", layer.mlp.down_proj)
 
         layer_weights[(0, LM_HEAD)] = ("lm_head", self.model.lm_head)
         return layer_weights
@@ -86,7 +82,7 @@ class FlashMistral(FlashCausalLM):
         return [Q_PROJ, V_PROJ]
 
     def get_num_layers_for_type(self, layer_type: str) -> int:
-        return 1 if layer_type == LM_HEAD else len(self.model.model.layers)
+        return 1 if layer_type == LM_HEAD else self.num_layers
 
     def is_row_parallel(self, layer_type: str) -> bool:
         return layer_type in ROW_PARALLEL
@@ -33,6 +33,7 @@ ADAPTER_LAYERS = [
     MLP_DOWN_PROJ,
     LM_HEAD,
 ]
+EMBEDDING_ADAPTER_LAYERS = [layer_type for layer_type in ADAPTER_LAYERS if layer_type != LM_HEAD]
 ROW_PARALLEL = {ATTN_O_PROJ, MLP_DOWN_PROJ, LM_HEAD}
 
 
@@ -101,11 +102,15 @@ class FlashQwen2(FlashCausalLM):
             layer_weights[(i, MLP_UP_PROJ)] = (f"{prefix}.{i}.mlp.up_proj", layer.mlp.gate_up_proj)
             layer_weights[(i, MLP_DOWN_PROJ)] = (f"{prefix}.{i}.mlp.down_proj", layer.mlp.down_proj)
 
-        layer_weights[(0, LM_HEAD)] = ("lm_head", self.model.lm_head)
+        if self.model.lm_head is not None:
+            # The embedding variant has no lm_head, so there is nothing for an adapter to target
+            layer_weights[(0, LM_HEAD)] = ("lm_head", self.model.lm_head)
         return layer_weights
 
     @property
     def adapter_layers(self) -> List[str]:
+        if self._supports_embeddings:
+            return EMBEDDING_ADAPTER_LAYERS
         return ADAPTER_LAYERS
 
     @property
@@ -65,6 +65,9 @@ class Model(ABC):
         self.dynamic_adapter_loading_enabled = dynamic_adapter_loading_enabled
         self.layer_to_adapter_weights: Dict[str, LayerAdapterWeights] = defaultdict(LayerAdapterWeights)
         self.target_to_layer = self.adapter_target_to_layer()
+        # Layer weight names are fixed once the model is built, so compute them once rather than per adapter load
+        self.target_weight_names = tuple(v[0] for v in self.target_to_layer.values())
+        self.target_to_layer_by_type = self._group_target_to_layer_by_type()
         self.loaded_adapters = set()
         self.static_adapter_id = adapter_id
         self.preloaded_adapter_indices = set()
@@ -186,6 +189,16 @@ class Model(ABC):
     def adapter_target_to_layer(self) -> Dict[str, Tuple[str, torch.Tensor]]:
         return {}
 
+    def _group_target_to_layer_by_type(self) -> Dict[str, List[Optional[Tuple[str, torch.Tensor]]]]:
+        """Regroups `target_to_layer` by layer type so that `[layer_type][layer_id]` lookups avoid tuple keys."""
+        by_type: Dict[str, List[Optional[Tuple[str, torch.Tensor]]]] = {}
+        for (layer_id, layer_type), target in self.target_to_layer.items():
+            layers = by_type.setdefault(layer_type, [])
+            if layer_id >= len(layers):
+                layers.extend([None] * (layer_id + 1 - len(layers)))
+            layers[layer_id] = target
+        return by_type
+
     @property
     def adapter_layers(self) -> List[str]:
         return []
@@ -249,7 +262,6 @@ class Model(ABC):
             )
 
         logger.info(f"Loading adapter weights into model: {','.join(adapter_parameters.adapter_ids)}")
-        weight_names = tuple([v[0] for v in self.target_to_layer.values()])
         (
             module_map,
             adapter_config,
@@ -260,7 +272,7 @@ class Model(ABC):
             adapter_parameters,
             adapter_source,
             adapter_index,
-            weight_names,
+            self.target_weight_names,
             api_token,
             self.trust_remote_code,
         )
@@ -1,6 +1,9 @@
+import hashlib
+import weakref
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import List, Optional, Sequence
 
 import numpy as np
 import torch
@@ -129,6 +132,44 @@ class Generation:
         )
 
 
+# Embedding requests often repeat the same inputs, so recent tokenizations are kept in memory across requests:
+# up to 256 batches per tokenizer, only for batches of at most 8192 characters, released with the tokenizer.
+# Keys are digests, but the cached token ids decode back to the prompt text.
+EMBEDDING_TOKENIZATION_CACHE_SIZE = 256
+EMBEDDING_TOKENIZATION_MAX_CACHED_CHARS = 8192
+_embedding_tokenization_caches: "weakref.WeakKeyDictionary[PreTrainedTokenizerBase, OrderedDict]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _tokenize_embedding_inputs(
+    tokenizer: PreTrainedTokenizerBase, batch_inputs: List[str], max_truncation: int, padding: bool
+) -> Sequence[Sequence[int]]:
+    if sum(len(inputs) for inputs in batch_inputs) > EMBEDDING_TOKENIZATION_MAX_CACHED_CHARS:
+        return tokenizer(batch_inputs, padding=padding, truncation=True, max_length=max_truncation)["input_ids"]
+
+    digest = hashlib.sha256()
+    for inputs in batch_inputs:
+        encoded = inputs.encode()
+        digest.update(len(encoded).to_bytes(8, "little"))
+        digest.update(encoded)
+    key = (digest.digest(), max_truncation, padding)
+
+    cache = _embedding_tokenization_caches.setdefault(tokenizer, OrderedDict())
+    input_ids = cache.get(key)
+    if input_ids is not None:
+        cache.move_to_end(key)
+        return input_ids
+
+    input_ids = tokenizer(batch_inputs, padding=padding, truncation=True, max_length=max_truncation)["input_ids"]
+    # Results are shared between calls, so they are stored as tuples to keep callers from mutating them
+    input_ids = tuple(tuple(ids) for ids in input_ids)
+    cache[key] = input_ids
+    if len(cache) > EMBEDDING_TOKENIZATION_CACHE_SIZE:
+        cache.popitem(last=False)
+    return input_ids
+
+
 @dataclass
 class FlashEmbeddingClassificationBatch(ABC):
     request_ids: List[int]
@@ -153,6 +194,32 @@ class FlashEmbeddingClassificationBatch(ABC):
         config,
         dtype: torch.dtype,
         device: torch.device,
+    ) -> "FlashEmbeddingClassificationBatch":
+        # Token classification reshapes the outputs to (batch_size, max_s), so every sequence is padded to max_s
+        return self._from_pb(pb, tokenizer, tokenizers, device, pad=True)
+
+    @classmethod
+    def from_pb_embed(
+        self,
+        pb: generate_pb2.Batch,
+        tokenizer: PreTrainedTokenizerBase,
+        tokenizers: TokenizerManager,
+        processor,
+        config,
+        dtype: torch.dtype,
+        device: torch.device,
+    ) -> "FlashEmbeddingClassificationBatch":
+        # Sequences are packed back to back and delimited by cu_seqlens, so embeddings need no padding
+        return self._from_pb(pb, tokenizer, tokenizers, device, pad=False)
+
+    @classmethod
+    def _from_pb(
+        self,
+        pb: generate_pb2.Batch,
+        tokenizer: PreTrainedTokenizerBase,
+        tokenizers: TokenizerManager,
+        device: torch.device,
+        pad: bool,
     ) -> "FlashEmbeddingClassificationBatch":
         batch_inputs = []
         max_truncation = 0
@@ -164,55 +231,44 @@ class FlashEmbeddingClassificationBatch(ABC):
         if all(r.HasField("tokenized_inputs") and len(r.tokenized_inputs.ids) > 0 for r in pb.requests):
             batch_tokenized_inputs = [r.tokenized_inputs.ids[-max_truncation:] for r in pb.requests]
         else:
-            batch_tokenized_inputs = tokenizer(batch_inputs, padding=True, truncation=True, max_length=max_truncation)[
-                "input_ids"
-            ]
+            batch_tokenized_inputs = _tokenize_embedding_inputs(tokenizer, batch_inputs, max_truncation, pad)
 
         pad_to = max(len(x) for x in batch_tokenized_inputs)
         all_input_ids = []
-        position_ids = []
-        all_token_type_ids = []
-        cu_seqlens = [0]
+        input_lengths = []
 
-        max_s = 0
-        cumulative_length = 0
-
-        for i, (r, tokenized_input) in enumerate(zip(pb.requests, batch_tokenized_inputs)):
-            tokenized_input = tokenized_input[-r.truncate :]
-            if len(tokenized_input) < pad_to:
+        for r, tokenized_input in zip(pb.requests, batch_tokenized_inputs):
+            tokenized_input = list(tokenized_input[-r.truncate :])
+            if pad and len(tokenized_input) < pad_to:
                 tokenized_input += [tokenizer.pad_token_id] * (pad_to - len(tokenized_input))
             all_input_ids.append(tokenized_input)
-            all_token_type_ids.append([0] * len(tokenized_input))
-
-            input_length = len(tokenized_input)
-            max_s = max(max_s, input_length)
-            cu_seqlens.append(cumulative_length + input_length)
-
-            # Position ids
-            request_position_ids = torch.arange(0, input_length, dtype=torch.int32)
-            position_ids.append(request_position_ids)
-
-            cumulative_length += input_length
-
-        if len(pb.requests) > 1:
-            input_ids = np.concatenate(all_input_ids, dtype=np.int64)
-            final_token_type_ids = np.concatenate(all_token_type_ids, dtype=np.int64)
-            position_ids = torch.cat(position_ids)
-        else:
-            input_ids = all_input_ids[0]
-            final_token_type_ids = all_token_type_ids[0]
-            position_ids = position_ids[0]
+            input_lengths.append(len(tokenized_input))
+
+        input_lengths = np.array(input_lengths, dtype=np.int32)
+        cu_seqlens = np.zeros(len(input_lengths) + 1, dtype=np.int32)
+        np.cumsum(input_lengths, out=cu_seqlens[1:])
+        num_tokens = int(cu_seqlens[-1])
+        max_s = int(input_lengths.max())
+
+        # Stage input ids, token type ids, position ids and cu_seqlens in one host buffer so the whole
+        # batch is moved to the device with a single host-to-device copy instead of one per tensor
+        host_buffer = torch.empty(3 * num_tokens + len(cu_seqlens), dtype=torch.int32, pin_memory=device.type == "cuda")
+        host_view = host_buffer.numpy()
+        host_view[:num_tokens] = np.concatenate(all_input_ids)
+        host_view[num_tokens : 2 * num_tokens] = 0
+        host_view[2 * num_tokens : 3 * num_tokens] = np.arange(num_tokens, dtype=np.int32) - np.repeat(
+            cu_seqlens[:-1], input_lengths
+        )
+        host_view[3 * num_tokens :] = cu_seqlens
 
-        input_ids = torch.tensor(input_ids, dtype=torch.int64, device=device)
-        final_token_type_ids = torch.tensor(final_token_type_ids, dtype=torch.int64, device=device)
-        position_ids = position_ids.to(device)
+        device_buffer = host_buffer.to(device, non_blocking=True)
 
         return FlashEmbeddingClassificationBatch(
             request_ids=[r.id for r in pb.requests],
-            input_ids=input_ids,
-            token_type_ids=final_token_type_ids,
-            position_ids=position_ids,
-            cu_seqlens=torch.tensor(cu_seqlens, dtype=torch.int32, device=device),
+            input_ids=device_buffer[:num_tokens],
+            token_type_ids=device_buffer[num_tokens : 2 * num_tokens],
+            position_ids=device_buffer[2 * num_tokens : 3 * num_tokens],
+            cu_seqlens=device_buffer[3 * num_tokens :],
             max_s=max_s,
             size=len(batch_tokenized_inputs),
         )
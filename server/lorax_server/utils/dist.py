@@ -1,5 +1,6 @@
 import os
 from datetime import timedelta
+from functools import lru_cache
 
 import torch
 from loguru import logger
@@ -45,6 +46,8 @@ class FakeGroup:
         return self._rank
 
 
+# Every model in the process shares the same group, so only the first call sets up the device and the NCCL comm
+@lru_cache(maxsize=None)
 def initialize_torch_distributed():
     if torch.cuda.is_available():
         from torch.distributed import ProcessGroupNCCL
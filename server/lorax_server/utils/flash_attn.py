@@ -1,3 +1,4 @@
+import inspect
 import os
 from typing import Union
 
@@ -12,6 +13,10 @@ if os.getenv("USE_FLASH_ATTENTION", "").lower() == "false":
     raise ImportError("`USE_FLASH_ATTENTION` is false.")
 HAS_FLASH_ATTN = False
 HAS_FLASH_ATTN_V2_CUDA = False
+HAS_FLASH_ATTN_V3 = False
+FLASH_ATTN_V3_HAS_WINDOW = False
+# Flash Attention 3 only ships kernels for these head sizes, in fp16 / bf16
+FLASH_ATTN_V3_HEAD_DIMS = (64, 128, 256)
 HAS_FLASH_ATTN_V2_ROCM = False
 ROCM_USE_FLASH_ATTN_V2_CK = False
 ROCM_USE_FLASH_ATTN_V2_TRITON = False
@@ -93,6 +98,19 @@ if SYSTEM in {"cuda", "rocm"}:
             )
         HAS_FLASH_ATTN_V2_CUDA = SYSTEM == "cuda"
         HAS_FLASH_ATTN_V2_ROCM = SYSTEM == "rocm"
+
+        # Hopper can opt into the warp-specialized Flash Attention 3 kernels when they are installed
+        if SYSTEM == "cuda" and is_sm90 and os.getenv("USE_FLASH_ATTENTION_V3", "").lower() == "true":
+            try:
+                import flash_attn_interface
+
+                HAS_FLASH_ATTN_V3 = True
+                FLASH_ATTN_V3_HAS_WINDOW = (
+                    "window_size" in inspect.signature(flash_attn_interface.flash_attn_varlen_func).parameters
+                )
+                logger.info("Using Flash Attention 3 kernels where supported.")
+            except ImportError:
+                logger.warning("`USE_FLASH_ATTENTION_V3` is set but Flash Attention 3 is not installed.")
     except ImportError as e:
         try:
             import flash_attn_cuda
@@ -153,22 +171,36 @@ if FLASH_INFER:
 
 elif HAS_FLASH_ATTN_V2_CUDA:
 
-    def attention(
-        q: torch.Tensor,
-        k: torch.Tensor,
-        v: torch.Tensor,
-        key_cache: torch.Tensor,
-        value_cache: torch.Tensor,
-        cu_seqlens,
-        max_s,
-        softmax_scale,
-        window_size_left=-1,
-        causal=True,
-        softcap=0.0,
-    ):
-        if window_size_left <= 0 and window_size_left != -1:
-            raise ValueError("`window_size_left` must be > 0 or -1")
+    def _use_flash_attn_v3(q: torch.Tensor, window_size_left: int, causal: bool, softcap: float) -> bool:
+        if not HAS_FLASH_ATTN_V3 or softcap != 0.0:
+            return False
+        if q.dtype not in (torch.float16, torch.bfloat16) or q.shape[-1] not in FLASH_ATTN_V3_HEAD_DIMS:
+            return False
+        # Without `window_size`, Flash Attention 3 can only reproduce the v2 masking for plain causal attention
+        return FLASH_ATTN_V3_HAS_WINDOW or (causal and window_size_left == -1)
+
+    def _attention_v3(q, k, v, cu_seqlens, max_s, softmax_scale, window_size_left, causal):
+        kwargs = {}
+        if FLASH_ATTN_V3_HAS_WINDOW:
+            # Same window as the v2 kernel, which always passes a right window of 0
+            kwargs["window_size"] = (window_size_left, 0)
+
+        out = flash_attn_interface.flash_attn_varlen_func(
+            q,
+            k,
+            v,
+            cu_seqlens,
+            cu_seqlens,
+            max_s,
+            max_s,
+            softmax_scale=softmax_scale,
+            causal=causal,
+            **kwargs,
+        )
+        # Older releases also return the softmax logsumexp
+        return out[0] if isinstance(out, tuple) else out
 
+    def _attention_v2(q, k, v, cu_seqlens, max_s, softmax_scale, window_size_left, causal):
         out = torch.empty_like(q)
         return flash_attn_2_cuda.varlen_fwd(
             q,
@@ -192,6 +224,26 @@ elif HAS_FLASH_ATTN_V2_CUDA:
             None,
         )[0]
 
+    def attention(
+        q: torch.Tensor,
+        k: torch.Tensor,
+        v: torch.Tensor,
+        key_cache: torch.Tensor,
+        value_cache: torch.Tensor,
+        cu_seqlens,
+        max_s,
+        softmax_scale,
+        window_size_left=-1,
+        causal=True,
+        softcap=0.0,
+    ):
+        if window_size_left <= 0 and window_size_left != -1:
+            raise ValueError("`window_size_left` must be > 0 or -1")
+
+        if _use_flash_attn_v3(q, window_size_left, causal, softcap):
+            return _attention_v3(q, k, v, cu_seqlens, max_s, softmax_scale, window_size_left, causal)
+        return _attention_v2(q, k, v, cu_seqlens, max_s, softmax_scale, window_size_left, causal)
+
 elif HAS_FLASH_ATTN_V2_ROCM and ROCM_USE_FLASH_ATTN_V2_CK:
 
     def attention(
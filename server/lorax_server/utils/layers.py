@@ -1,7 +1,9 @@
 import math
 import os
+import weakref
 from typing import TYPE_CHECKING, Optional, Tuple
 
+import numpy as np
 import torch
 import torch.distributed
 from accelerate import init_empty_weights
@@ -10,7 +12,13 @@ from torch.nn import functional as F
 
 from lorax_server.adapters.types import LORA, MEDUSA
 from lorax_server.layers.linear import FastLinear, get_linear  # noqa: F401
-from lorax_server.layers.tensor_parallel import SuperLayer, TensorParallelColumnLinear, TensorParallelHead  # noqa: F401
+from lorax_server.layers.tensor_parallel import (  # noqa: F401
+    SuperLayer,
+    TensorParallelColumnLinear,
+    TensorParallelHead,
+    remap_embedding_ids,
+)
+from lorax_server.utils.import_utils import SYSTEM
 from lorax_server.utils.lora import LM_HEAD
 from lorax_server.utils.sgmv import (
     add_lora_a_bgmv,
@@ -18,7 +26,6 @@ from lorax_server.utils.sgmv import (
     has_sgmv,
     lora_a_sgmv_cutlass,
     lora_b_sgmv_cutlass,
-    orient_for_rank,
 )
 from lorax_server.utils.state import get_speculative_tokens, is_warmup
 
@@ -36,8 +43,8 @@ def load_layer_norm(cls, prefix, weights, eps):
     with init_empty_weights():
         ln = cls(weight.shape, eps=eps)
 
-    ln.weight = nn.Parameter(weight)
-    ln.bias = nn.Parameter(bias)
+    ln.weight = nn.Parameter(weight, requires_grad=False)
+    ln.bias = nn.Parameter(bias, requires_grad=False)
     return ln
 
 
@@ -47,7 +54,7 @@ def load_layer_norm_no_bias(cls, prefix, weights, eps):
     with init_empty_weights():
         ln = cls(weight.shape, eps=eps)
 
-    ln.weight = nn.Parameter(weight)
+    ln.weight = nn.Parameter(weight, requires_grad=False)
     ln.bias = None
     return ln
 
@@ -74,16 +81,21 @@ class LoraLinear(nn.Module):
     ) -> torch.Tensor:
         data = adapter_data.data.get(layer_type)
         data: Optional["BatchLoraWeights"] = data.get(LORA) if data is not None else None
+        if data is None:
+            # No LoRA in the batch targets this layer type
+            return result
 
-        if has_sgmv() and data is not None and data.can_vectorize(self.process_group):
-            if end_idx - start_idx != result.shape[1]:
-                proj = torch.zeros_like(result[:, start_idx:end_idx])
-            else:
-                proj = result
+        if has_sgmv() and data.can_vectorize(self.process_group):
+            # The kernels need a contiguous output, so a column slice of the result gets its own buffer.
+            # It is only allocated once a rank group actually has weights to apply.
+            is_slice = end_idx - start_idx != result.shape[1]
+            proj = None if is_slice else result
 
             for r, rank_segments in data.rank_data.items():
                 lora_a_ptr = rank_segments.lora_a_ptr
                 lora_b_ptr = rank_segments.lora_b_ptr
+                if lora_a_ptr is not None and lora_b_ptr is not None and proj is None:
+                    proj = torch.zeros_like(result[:, start_idx:end_idx])
 
                 if data.use_sgmv:
                     # Use SGMV for prefill
@@ -133,17 +145,17 @@ class LoraLinear(nn.Module):
                             self.layer_id,
                         )
 
-            if end_idx - start_idx != result.shape[1]:
+            if is_slice and proj is not None:
                 result[:, start_idx:end_idx] += proj
         else:
             adapter_indices = adapter_data.meta.adapter_indices
-            if data is not None and data.prefill_head_indices is not None and data.layer_name == LM_HEAD:
+            if data.prefill_head_indices is not None and data.layer_name == LM_HEAD:
                 # LM_HEAD inputs have different shape during prefill than other layers
                 adapter_indices = adapter_indices[data.prefill_head_indices]
 
             speculative_tokens = get_speculative_tokens()
             for adapter_index in adapter_data.meta.adapter_set:
-                if data is not None and data.has_adapter(adapter_index):
+                if data.has_adapter(adapter_index):
                     adapter_mask = (adapter_indices == adapter_index).to(input.dtype).view(-1, 1)
 
                     # If we're doing speculative decoding, then the input will have 3D shape:
@@ -169,8 +181,6 @@ class LoraLinear(nn.Module):
         lora_a = data.lora_a[adapter_index][self.layer_id, :, :]
         lora_b = data.lora_b[adapter_index][self.layer_id, :, :]
 
-        lora_a = orient_for_rank(lora_a, lora_b.size(0))
-
         a_out = input @ lora_a
         if self.process_group.size() > 1:
             a_out = self.collect_lora_a(a_out)
@@ -188,6 +198,18 @@ class TensorParallelMultiAdapterLinear(LoraLinear):
         self.layer_names = layer_names
         self.sizes = sizes
 
+        # Output column range of each layer type for this rank, where an end of None spans the full output
+        world_size = process_group.size()
+        self.layer_ranges = []
+        offset = 0
+        for i, layer_name in enumerate(layer_names):
+            start_idx = offset // world_size
+            end_idx = None
+            if sizes is not None:
+                offset += sizes[i]
+                end_idx = offset // world_size
+            self.layer_ranges.append((layer_name, start_idx, end_idx))
+
     @classmethod
     def load(cls, base_layer, layer_id, layer_names, sizes, process_group):
         return TensorParallelMultiAdapterLinear(base_layer, layer_id, layer_names, sizes, process_group)
@@ -205,16 +227,13 @@ class TensorParallelMultiAdapterLinear(LoraLinear):
             input = input.reshape(-1, input.shape[-1])
             result = result.reshape(-1, result.shape[-1])
 
-        offset = 0
-        for i, layer_name in enumerate(self.layer_names):
-            start_idx = offset // self.process_group.size()
+        for layer_name, start_idx, end_idx in self.layer_ranges:
+            if layer_name not in adapter_data.data:
+                # No adapter in the batch targets this layer type
+                continue
 
-            if self.sizes is not None:
-                offset += self.sizes[i]
-                end_idx = offset // self.process_group.size()
-            else:
+            if end_idx is None:
                 end_idx = result.shape[1]
-
             result = self.forward_layer_type(result, input, adapter_data, layer_name, start_idx, end_idx)
 
         if is_3d:
@@ -230,9 +249,11 @@ class TensorParallelMultiAdapterLinear(LoraLinear):
         #   instead we could pre-allocate a (B, a, r) tensor for all adapters with the same
         #   rank, compute `a_out` on each, and then slice them into the buffer as shown here:
         #   https://discuss.pytorch.org/t/concatenate-tensors-without-memory-copying/34609
-        gathered_tensors = [torch.empty_like(a_out) for _ in range(self.process_group.size())]
-        torch.distributed.all_gather(gathered_tensors, a_out)
-        return torch.cat(gathered_tensors, dim=1)
+        a_out = a_out.contiguous()
+        gathered = a_out.new_empty(self.process_group.size(), *a_out.shape)
+        torch.distributed.all_gather_into_tensor(gathered, a_out, group=self.process_group)
+        # (world_size, B, r) -> (B, world_size * r), matching a concatenation of the shards along dim 1
+        return gathered.permute(1, 0, 2).reshape(a_out.shape[0], -1)
 
 
 class TensorParallelAdapterRowLinear(LoraLinear):
@@ -356,21 +377,18 @@ class TensorParallelEmbedding(nn.Module):
         block_size = num_embeddings // world_size
         self.min_id = rank * block_size
         self.max_id = min(num_embeddings, (rank + 1) * block_size)
+        self.span = self.max_id - self.min_id
         self.null_idx = block_size
         self.process_group = weights.process_group
         self.reduce = reduce
 
         """Additional 0 entry used for masking"""
-        self.weight = nn.Parameter(F.pad(weight, (0, 0, 0, 1)))
+        self.weight = nn.Parameter(F.pad(weight, (0, 0, 0, 1)), requires_grad=False)
 
     def forward(self, input: torch.Tensor) -> torch.Tensor:
         # default all out of bounds values to `self.null_idx` that will then be mapped to 0
         # translate for [0, self.max_id - self.min_id[
-        input = torch.where(
-            (self.min_id > input) | (input >= self.max_id),
-            self.null_idx,
-            input - self.min_id,
-        )
+        input = remap_embedding_ids(input, self.min_id, self.span, self.null_idx)
         out = torch.nn.functional.embedding(input, self.weight)
         if self.reduce and self.process_group.size() > 1:
             torch.distributed.all_reduce(out, group=self.process_group)
@@ -381,39 +399,45 @@ try:
     import dropout_layer_norm
 
     class FastLayerNorm(nn.LayerNorm):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            # The fused kernel only supports hidden sizes up to 8192, which is fixed once the layer is built
+            if self.normalized_shape[-1] > 8192:
+                self.forward = self._forward_unfused
+
+        def _forward_unfused(self, hidden_states, residual=None):
+            if residual is not None:
+                hidden_states += residual
+            residual = hidden_states
+
+            return super(FastLayerNorm, self).forward(hidden_states), residual
+
         def forward(self, hidden_states, residual=None):
-            if hidden_states.shape[-1] > 8192:
-                if residual is not None:
-                    hidden_states += residual
+            (
+                normed_hidden_states,
+                residual,
+                *rest,
+            ) = dropout_layer_norm.dropout_add_ln_fwd(
+                hidden_states,
+                residual,
+                self.weight,
+                self.bias,
+                None,
+                None,
+                None,
+                None,
+                0.0,
+                self.eps,
+                1.0,
+                0,
+                None,
+                False,
+                False,
+            )
+            if residual is None:
                 residual = hidden_states
 
-                return super(FastLayerNorm, self).forward(hidden_states), residual
-            else:
-                (
-                    normed_hidden_states,
-                    residual,
-                    *rest,
-                ) = dropout_layer_norm.dropout_add_ln_fwd(
-                    hidden_states,
-                    residual,
-                    self.weight,
-                    self.bias,
-                    None,
-                    None,
-                    None,
-                    None,
-                    0.0,
-                    self.eps,
-                    1.0,
-                    0,
-                    None,
-                    False,
-                    False,
-                )
-                if residual is None:
-                    residual = hidden_states
-
-                return normed_hidden_states, residual
+            return normed_hidden_states, residual
 
 except ImportError:
     pass
@@ -423,10 +447,36 @@ try:
     import rotary_emb
     from flash_attn.layers.rotary import RotaryEmbedding  # noqa: F401
 
+    try:
+        from flash_attn.ops.triton.rotary import apply_rotary as triton_apply_rotary
+
+        # ROCm also reports compute capability >= 8 but keeps the rotary_emb kernel
+        _USE_TRITON_ROTARY = SYSTEM == "cuda" and torch.cuda.get_device_capability()[0] >= 8
+    except ImportError:
+        _USE_TRITON_ROTARY = False
+
     def _create_inv_freq(dim, base, device):
         inv_freq = 1.0 / (base ** (torch.arange(0, dim, 2, device=device, dtype=torch.float32) / dim))
         return inv_freq
 
+    def _build_cos_sin(inv_freq, seqlen, device, dtype, scaling_factor=None, mscale=1.0):
+        # The tables are small enough that building them in fp32 on the host and uploading the result once
+        # is cheaper than launching the arange/outer/cos/sin kernels on device
+        t = np.arange(seqlen, dtype=np.float32)
+        if scaling_factor is not None:
+            t /= scaling_factor
+
+        # Tables are stored as [seqlen, 1, dim / 2] so gathered rows already broadcast over the heads
+        freqs = np.outer(t, inv_freq.cpu().numpy())[:, None, :]
+        cos, sin = np.cos(freqs), np.sin(freqs)
+        if mscale != 1.0:
+            cos *= mscale
+            sin *= mscale
+        return (
+            torch.from_numpy(cos).to(device=device, dtype=dtype),
+            torch.from_numpy(sin).to(device=device, dtype=dtype),
+        )
+
     def _get_rope_config(config):
         if os.getenv("ROPE_SCALING", None) is not None:
             rope_scaling = {
@@ -436,6 +486,9 @@ try:
             return rope_scaling
         return getattr(config, "rope_scaling", None)
 
+    # Rotary embeddings built through `PositionRotaryEmbedding.static`, keyed by everything that determines their tables
+    _STATIC_ROTARY_EMBEDDINGS = weakref.WeakValueDictionary()
+
     class PositionRotaryEmbedding(nn.Module):
         def __init__(self, inv_freq, scaling_factor, max_position_embeddings, device, dtype):
             super().__init__()
@@ -451,6 +504,26 @@ try:
 
         @classmethod
         def static(cls, config, dim, base, device, dtype):
+            # Every layer asks for an identical embedding, so share a single instance and its cos/sin tables
+            # instead of keeping one copy of the tables per layer
+            key = (
+                cls,
+                dim,
+                base,
+                str(device),
+                dtype,
+                config.max_position_embeddings,
+                getattr(config, "original_max_position_embeddings", None),
+                repr(_get_rope_config(config)),
+            )
+            rotary_emb = _STATIC_ROTARY_EMBEDDINGS.get(key)
+            if rotary_emb is None:
+                rotary_emb = cls._static(config, dim, base, device, dtype)
+                _STATIC_ROTARY_EMBEDDINGS[key] = rotary_emb
+            return rotary_emb
+
+        @classmethod
+        def _static(cls, config, dim, base, device, dtype):
             inv_freq = _create_inv_freq(dim, base, device)
             scaling_factor = None
             rope_scaling = _get_rope_config(config)
@@ -565,15 +638,9 @@ try:
             # or if we're on a new device (possibly due to tracing for instance)
             if seqlen > self._seq_len_cached or self._cos_cached.device != device or self._cos_cached.dtype != dtype:
                 self._seq_len_cached = seqlen
-                t = torch.arange(seqlen, device=device, dtype=self.inv_freq.dtype)
-                if self.scaling_factor is not None:
-                    t /= self.scaling_factor
-                # Don't do einsum, it converts fp32 to fp16
-                # freqs = torch.einsum("i,j->ij", t, self.inv_freq)
-
-                freqs = torch.outer(t, self.inv_freq.to(device=t.device))
-                self._cos_cached = torch.cos(freqs).to(dtype)
-                self._sin_cached = torch.sin(freqs).to(dtype)
+                self._cos_cached, self._sin_cached = _build_cos_sin(
+                    self.inv_freq, seqlen, device, dtype, scaling_factor=self.scaling_factor
+                )
 
         def get_cos_sin(self, position_ids: torch.Tensor, max_s: int, dtype: torch.dtype):
             """
@@ -590,9 +657,14 @@ try:
 
             cos = torch.index_select(self._cos_cached, 0, position_ids)
             sin = torch.index_select(self._sin_cached, 0, position_ids)
-            return cos.unsqueeze(1), sin.unsqueeze(1)
+            return cos, sin
 
         def forward(self, x: torch.Tensor, cos: torch.Tensor, sin: torch.Tensor):
+            if _USE_TRITON_ROTARY:
+                # Treat the flattened tokens as a single sequence so token i reads row i of the gathered cos/sin
+                triton_apply_rotary(x.unsqueeze(0), cos.squeeze(1), sin.squeeze(1), interleaved=False, inplace=True)
+                return x
+
             rotary_dim = cos.shape[-1]
             x1 = x[..., :rotary_dim]
             x2 = x[..., rotary_dim : 2 * rotary_dim]
@@ -618,13 +690,7 @@ try:
                     ) ** (self.dim / (self.dim - 2))
                     self.inv_freq = _create_inv_freq(self.dim, newbase, self.inv_freq.device)
                 self._seq_len_cached = seqlen
-                t = torch.arange(seqlen, device=device, dtype=self.inv_freq.dtype)
-                # Don't do einsum, it converts fp32 to fp16
-                # freqs = torch.einsum("i,j->ij", t, self.inv_freq)
-
-                freqs = torch.outer(t, self.inv_freq.to(device=t.device))
-                self._cos_cached = torch.cos(freqs).to(dtype)
-                self._sin_cached = torch.sin(freqs).to(dtype)
+                self._cos_cached, self._sin_cached = _build_cos_sin(self.inv_freq, seqlen, device, dtype)
 
     class YarnPositionRotaryEmbedding(PositionRotaryEmbedding):
         """https://github.com/jquesnelle/yarn/blob/master/scaled_rope/LlamaYaRNScaledRotaryEmbedding.py"""
@@ -655,20 +721,25 @@ try:
             self.finetuned = finetuned
 
             self.yarn(device, factor)
-            super().__init__(_create_inv_freq(dim, base, device), factor, max_position_embeddings, device, dtype)
+            # Build the tables from the yarn-corrected frequencies computed above
+            super().__init__(self.inv_freq, factor, max_position_embeddings, device, dtype)
 
         def _update_cos_sin_cache(self, dtype, device, seqlen):
             if seqlen > self._seq_len_cached or self._cos_cached.device != device or self._cos_cached.dtype != dtype:
                 self._seq_len_cached = seqlen
-
-                t = torch.arange(self._seq_len_cached, device=device, dtype=self.inv_freq.dtype)
-                freqs = torch.outer(t, self.inv_freq.to(device=t.device))
-
-                self._cos_cached = (torch.cos(freqs) * self.mscale).to(dtype)
-                self._sin_cached = (torch.sin(freqs) * self.mscale).to(dtype)
+                self._cos_cached, self._sin_cached = _build_cos_sin(
+                    self.inv_freq, seqlen, device, dtype, mscale=self.mscale
+                )
 
         def yarn(self, device, scaling_factor):
-            pos_freqs = self.base ** (torch.arange(0, self.dim, 2).float().to(device) / self.dim)
+            if scaling_factor == 1:
+                # Interpolation and extrapolation frequencies coincide, so the ramp blend is the identity
+                self.inv_freq = _create_inv_freq(self.dim, self.base, device)
+                self.mscale = float(self.attn_factor)
+                return
+
+            # Only dim / 2 frequencies, so compute them on the host and upload the result once
+            pos_freqs = self.base ** (np.arange(0, self.dim, 2, dtype=np.float32) / self.dim)
             inv_freq_extrapolation = 1.0 / pos_freqs
             inv_freq_interpolation = 1.0 / (scaling_factor * pos_freqs)
 
@@ -680,11 +751,11 @@ try:
                 self.original_max_position_embeddings,
             )
             inv_freq_mask = (
-                1 - linear_ramp_mask(low, high, self.dim // 2).float().to(device)
+                1 - linear_ramp_mask(low, high, self.dim // 2)
             ) * self.extrapolation_factor  # Get n-d rotational scaling corrected for extrapolation
             inv_freq = inv_freq_interpolation * (1 - inv_freq_mask) + inv_freq_extrapolation * inv_freq_mask
 
-            self.inv_freq = inv_freq
+            self.inv_freq = torch.from_numpy(inv_freq.astype(np.float32)).to(device)
             self.mscale = float(
                 get_mscale(scaling_factor) * self.attn_factor
             )  # Get n-d magnitude scaling corrected for interpolation
@@ -718,15 +789,9 @@ try:
                     inv_freq = self.long_inv_freq
                 else:
                     inv_freq = self.short_inv_freq
-                t = torch.arange(seqlen, device=device, dtype=inv_freq.dtype)
-                if self.scaling_factor is not None:
-                    t /= self.scaling_factor
-                # Don't do einsum, it converts fp32 to fp16
-                # freqs = torch.einsum("i,j->ij", t, self.inv_freq)
-
-                freqs = torch.outer(t, inv_freq.to(device=t.device))
-                self._cos_cached = torch.cos(freqs).to(dtype)
-                self._sin_cached = torch.sin(freqs).to(dtype)
+                self._cos_cached, self._sin_cached = _build_cos_sin(
+                    inv_freq, seqlen, device, dtype, scaling_factor=self.scaling_factor
+                )
 
     # Inverse dim formula to find dim based on number of rotations
     def find_correction_dim(num_rotations, dim, base=10000, max_position_embeddings=2048):
@@ -742,9 +807,10 @@ try:
         if min == max:
             max += 0.001  # Prevent singularity
 
-        linear_func = (torch.arange(dim, dtype=torch.float32) - min) / (max - min)
-        ramp_func = torch.clamp(linear_func, 0, 1)
-        return ramp_func
+        ramp_func = np.arange(dim, dtype=np.float32)
+        ramp_func -= min
+        ramp_func /= max - min
+        return np.clip(ramp_func, 0, 1, out=ramp_func)
 
     def get_mscale(scale=1):
         if scale <= 1:
@@ -1,6 +1,8 @@
 import json
 import os
+import struct
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Union
 
@@ -13,6 +15,24 @@ from safetensors import safe_open
 
 from lorax_server.utils.sources import PBASE, S3, map_pbase_model_id_to_s3
 
+# Read whole tensors from NVMe directly into device memory with GPUDirect Storage (requires kvikio)
+USE_GDS = os.getenv("LORAX_USE_GDS", "0") == "1"
+
+_SAFETENSORS_DTYPES = {
+    "BOOL": torch.bool,
+    "U8": torch.uint8,
+    "I8": torch.int8,
+    "I16": torch.int16,
+    "I32": torch.int32,
+    "I64": torch.int64,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "F32": torch.float32,
+    "F64": torch.float64,
+    "F8_E4M3": torch.float8_e4m3fn,
+    "F8_E5M2": torch.float8_e5m2,
+}
+
 
 class AbstractWeights(ABC):
     @abstractmethod
@@ -282,6 +302,80 @@ class InMemoryWeights(AbstractWeights):
         return self._process_group
 
 
+class GdsReader:
+    """Reads safetensors tensors with cuFile so the bytes are DMA'd into device memory without a host bounce buffer."""
+
+    def __init__(self, device: torch.device):
+        # cuFile handles are closed by `close`, or when the reader is garbage collected with its `Weights`
+        self._files = {}
+        self._headers: Dict[str, Tuple[int, Dict]] = {}
+        self.device = device
+
+        import kvikio
+
+        self._kvikio = kvikio
+
+    def _get_header(self, filename: str) -> Tuple[int, Dict]:
+        if filename not in self._headers:
+            with open(filename, "rb") as f:
+                (header_size,) = struct.unpack("<Q", f.read(8))
+                header = json.loads(f.read(header_size))
+            self._headers[filename] = (8 + header_size, header)
+        return self._headers[filename]
+
+    def _get_file(self, filename: str):
+        if filename not in self._files:
+            self._files[filename] = self._kvikio.CuFile(filename, "r")
+        return self._files[filename]
+
+    def get_tensor(self, filename: str, tensor_name: str) -> Optional[torch.Tensor]:
+        """Returns the tensor, or None if its dtype cannot be reinterpreted here and the caller should use safe_open."""
+        data_start, header = self._get_header(filename)
+        info = header[tensor_name]
+        dtype = _SAFETENSORS_DTYPES.get(info["dtype"])
+        if dtype is None:
+            logger.debug(f"GDS cannot read {tensor_name} with dtype {info['dtype']}, falling back to safetensors")
+            return None
+
+        # Read into a byte buffer and reinterpret it, as not every dtype (e.g. bfloat16) can be exported to cuFile
+        start, end = info["data_offsets"]
+        buffer = torch.empty(end - start, dtype=torch.uint8, device=self.device)
+        if end > start:
+            self._get_file(filename).read(buffer, end - start, data_start + start)
+        return buffer.view(dtype).view(info["shape"])
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
+def _read_keys(filenames: List[Path]) -> List[Tuple[Path, List[str]]]:
+    """Reads the tensor names in each safetensors file, opening the files concurrently.
+
+    Results are returned in the same order as `filenames` so that routing stays deterministic.
+    """
+
+    def _keys(filename: Path) -> List[str]:
+        with safe_open(filename, framework="pytorch") as f:
+            return list(f.keys())
+
+    if len(filenames) <= 1:
+        return [(filename, _keys(filename)) for filename in filenames]
+
+    with ThreadPoolExecutor(max_workers=min(8, len(filenames))) as executor:
+        return list(zip(filenames, executor.map(_keys, filenames)))
+
+
 class Weights(AbstractWeights):
     """
     A class representing weights for a model.
@@ -316,30 +410,24 @@ class Weights(AbstractWeights):
         # to ensure that adapter weights are loaded instead of main model weights
         routing = {}
         if merged_weight_filenames is not None:
-            for filename in merged_weight_filenames:
-                with safe_open(filename, framework="pytorch") as f:
-                    for k in f.keys():
-                        if k in routing:
-                            raise RuntimeError(
-                                f"Key {k} was found in multiple adapter files: {filename} and {routing[k]}"
-                            )
-                        routing[k] = filename
+            for filename, keys in _read_keys(merged_weight_filenames):
+                for k in keys:
+                    if k in routing:
+                        raise RuntimeError(f"Key {k} was found in multiple adapter files: {filename} and {routing[k]}")
+                    routing[k] = filename
 
         # set of keys that point to adapter files. Duplicates for these keys found
         # in main model files will be overridden.
         adapter_routes = set(routing.keys())
 
-        for filename in filenames:
-            with safe_open(filename, framework="pytorch") as f:
-                for k in f.keys():
-                    if k in adapter_routes:
-                        logger.debug(f"Overriding main model weights with adapter weights for key: {k}")
-                    elif k in routing:
-                        raise RuntimeError(
-                            f"Key {k} was found in multiple non-adapter files: {filename} and {routing[k]}"
-                        )
-                    else:
-                        routing[k] = filename
+        for filename, keys in _read_keys(filenames):
+            for k in keys:
+                if k in adapter_routes:
+                    logger.debug(f"Overriding main model weights with adapter weights for key: {k}")
+                elif k in routing:
+                    raise RuntimeError(f"Key {k} was found in multiple non-adapter files: {filename} and {routing[k]}")
+                else:
+                    routing[k] = filename
 
         if aliases is None:
             aliases = {}
@@ -349,11 +437,18 @@ class Weights(AbstractWeights):
         self.dtype = dtype
         self._process_group = process_group
         self._handles = {}
+        self._gds_reader = GdsReader(device) if USE_GDS and torch.device(device).type == "cuda" else None
 
     @property
     def process_group(self):
         return self._process_group
 
+    def close(self):
+        """Releases the open file handles. Handles are reopened on demand if the weights are read again."""
+        if self._gds_reader is not None:
+            self._gds_reader.close()
+        self._handles.clear()
+
     def _get_handle(self, filename):
         if filename not in self._handles:
             f = safe_open(filename, framework="pytorch")
@@ -383,8 +478,10 @@ class Weights(AbstractWeights):
 
     def get_tensor(self, tensor_name: str, use_self_dtype: bool = True):
         filename, tensor_name = self.get_filename(tensor_name)
-        f = self._get_handle(filename)
-        tensor = f.get_tensor(tensor_name)
+        tensor = self._gds_reader.get_tensor(filename, tensor_name) if self._gds_reader is not None else None
+        if tensor is None:
+            f = self._get_handle(filename)
+            tensor = f.get_tensor(tensor_name)
         # Special case for gptq which shouldn't convert
         # u4 which are disguised as int32
         if tensor.dtype not in [torch.int32, torch.int64, torch.float8_e4m3fn, torch.float8_e5m2]:
@@ -1,3 +1,4 @@
+import pytest
 import torch
 
 from lorax_server.adapters.medusa import BatchMedusaWeights, MedusaConfig
@@ -12,14 +13,14 @@ model_id = "mistralai/Mistral-7B-Instruct-v0.2"
 adapter_id = "predibase/Mistral-7B-Instruct-v0.2-medusa"
 
 
-def test_batched_medusa_weights(default_causal_lm: CausalLM):
+# Shared by the parametrized cases below so the adapter is downloaded and loaded once
+@pytest.fixture(scope="module")
+def medusa_assets(default_causal_lm: CausalLM):
     download_adapter_weights(adapter_id, HUB)
 
     module_map, medusa_config, _, _ = load_module_map(
         model_id, adapter_id, HUB, tuple(), None
     )
-    assert isinstance(medusa_config, MedusaConfig)
-
     medusa_weights = medusa_config.load_batched_adapter_weights(
         default_causal_lm,
         module_map,
@@ -27,19 +28,32 @@ def test_batched_medusa_weights(default_causal_lm: CausalLM):
         set(),
         False,
     )
+    return module_map, medusa_config, medusa_weights
+
+
+@pytest.mark.parametrize(
+    "adapter_indices,adapter_segments,segment_indices",
+    [
+        ([0, 0, 1, 1, 0, 0, 1, 1], [0, 2, 4, 6, 8], [0, 1, 0, 1]),
+        ([0, 0, 0, 0], [0, 4], [0]),
+    ],
+    ids=["two-adapters", "single-adapter"],
+)
+def test_batched_medusa_weights(medusa_assets, adapter_indices, adapter_segments, segment_indices):
+    _, medusa_config, medusa_weights = medusa_assets
+    assert isinstance(medusa_config, MedusaConfig)
 
+    adapter_set = set(segment_indices)
     meta = AdapterBatchMetadata(
-        adapter_indices=torch.tensor([0, 0, 1, 1, 0, 0, 1, 1], dtype=torch.int64),
-        adapter_set={0, 1},
-        adapter_segments=torch.tensor([0, 2, 4, 6, 8], dtype=torch.int64),
-        segment_indices=[0, 1, 0, 1],
+        adapter_indices=torch.tensor(adapter_indices, dtype=torch.int64),
+        adapter_set=adapter_set,
+        adapter_segments=torch.tensor(adapter_segments, dtype=torch.int64),
+        segment_indices=segment_indices,
     )
 
+    # Only the adapters that appear in this batch get weights
     batch_medusa_weights = BatchMedusaWeights.load(
-        {
-            0: medusa_weights,
-            1: medusa_weights,
-        },
+        {adapter_index: medusa_weights for adapter_index in adapter_set},
         meta,
         layer_name=LM_HEAD,
         prefill=False,
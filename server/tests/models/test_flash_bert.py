@@ -0,0 +1,19 @@
+import pytest
+
+flash_bert = pytest.importorskip("lorax_server.models.flash_bert")
+
+
+@pytest.mark.parametrize("max_position_embeddings", [128, 512, 514, 8192])
+def test_graph_num_tokens_within_position_embeddings(max_position_embeddings):
+    graph_num_tokens = flash_bert.get_graph_num_tokens(max_position_embeddings)
+    assert graph_num_tokens
+    assert max(graph_num_tokens) <= max_position_embeddings
+    assert graph_num_tokens == sorted(graph_num_tokens)
+
+
+def test_cached_num_tokens_falls_back_to_eager():
+    graph_num_tokens = flash_bert.get_graph_num_tokens(512)
+    assert flash_bert.get_cached_num_tokens(10, graph_num_tokens) == 16
+    assert flash_bert.get_cached_num_tokens(512, graph_num_tokens) == 512
+    # No graph is traced past the position embedding table, so larger inputs run eagerly
+    assert flash_bert.get_cached_num_tokens(513, graph_num_tokens) is None
@@ -0,0 +1,39 @@
+import pytest
+
+from lorax_server.models import types
+from lorax_server.models.types import _tokenize_embedding_inputs
+
+
+@pytest.mark.parametrize("padding", [True, False])
+def test_tokenize_embedding_inputs_cached(gpt2_tokenizer, padding):
+    batch_inputs = ["Test", "A longer test input"]
+    expected = gpt2_tokenizer(batch_inputs, padding=padding, truncation=True, max_length=16)["input_ids"]
+
+    input_ids = _tokenize_embedding_inputs(gpt2_tokenizer, batch_inputs, 16, padding)
+    assert [list(ids) for ids in input_ids] == expected
+
+    # The second call is served from the cache
+    assert _tokenize_embedding_inputs(gpt2_tokenizer, list(batch_inputs), 16, padding) is input_ids
+
+    # Truncation is part of the key
+    truncated = _tokenize_embedding_inputs(gpt2_tokenizer, batch_inputs, 2, padding)
+    assert [list(ids) for ids in truncated] == gpt2_tokenizer(
+        batch_inputs, padding=padding, truncation=True, max_length=2
+    )["input_ids"]
+
+
+def test_tokenize_embedding_inputs_uncached(gpt2_tokenizer, monkeypatch):
+    monkeypatch.setattr(types, "EMBEDDING_TOKENIZATION_CACHE_SIZE", 2)
+    cache = types._embedding_tokenization_caches.setdefault(gpt2_tokenizer, types.OrderedDict())
+    cache.clear()
+
+    # Large batches are tokenized without being cached
+    batch_inputs = ["x" * (types.EMBEDDING_TOKENIZATION_MAX_CACHED_CHARS + 1)]
+    input_ids = _tokenize_embedding_inputs(gpt2_tokenizer, batch_inputs, 8, False)
+    assert [list(ids) for ids in input_ids] == gpt2_tokenizer(batch_inputs, truncation=True, max_length=8)["input_ids"]
+    assert len(cache) == 0
+
+    # The cache keeps only the most recent entries
+    for i in range(3):
+        _tokenize_embedding_inputs(gpt2_tokenizer, [f"input {i}"], 8, False)
+    assert len(cache) == 2
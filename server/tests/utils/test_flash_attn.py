@@ -0,0 +1,47 @@
+import pytest
+import torch
+
+if not torch.cuda.is_available():
+    pytest.skip("CUDA not available", allow_module_level=True)
+
+flash_attn = pytest.importorskip("lorax_server.utils.flash_attn")
+
+requires_flash_attn_v3 = pytest.mark.skipif(
+    not flash_attn.HAS_FLASH_ATTN_V3, reason="Flash Attention 3 not enabled (USE_FLASH_ATTENTION_V3=true)"
+)
+
+
+def get_inputs(head_dim: int, dtype: torch.dtype):
+    seqlens = [5, 11]
+    total = sum(seqlens)
+    q = torch.randn((total, 4, head_dim), dtype=dtype, device="cuda")
+    k = torch.randn((total, 2, head_dim), dtype=dtype, device="cuda")
+    v = torch.randn((total, 2, head_dim), dtype=dtype, device="cuda")
+    cu_seqlens = torch.tensor([0, seqlens[0], total], dtype=torch.int32, device="cuda")
+    return q, k, v, cu_seqlens, max(seqlens)
+
+
+@requires_flash_attn_v3
+@pytest.mark.parametrize("causal", [True, False])
+@pytest.mark.parametrize("window_size_left", [-1, 4])
+def test_flash_attn_v3_matches_v2(causal: bool, window_size_left: int):
+    torch.manual_seed(0)
+    q, k, v, cu_seqlens, max_s = get_inputs(128, torch.float16)
+    softmax_scale = 128**-0.5
+
+    out = flash_attn.attention(
+        q, k, v, None, None, cu_seqlens, max_s, softmax_scale, window_size_left=window_size_left, causal=causal
+    )
+    ref = flash_attn._attention_v2(q, k, v, cu_seqlens, max_s, softmax_scale, window_size_left, causal)
+    torch.testing.assert_close(out, ref, atol=2e-3, rtol=2e-3)
+
+
+@requires_flash_attn_v3
+def test_flash_attn_v3_falls_back_to_v2():
+    q, _, _, _, _ = get_inputs(128, torch.float16)
+    assert flash_attn._use_flash_attn_v3(q, -1, True, 0.0)
+
+    # Unsupported head size, dtype, or softcap
+    assert not flash_attn._use_flash_attn_v3(get_inputs(80, torch.float16)[0], -1, True, 0.0)
+    assert not flash_attn._use_flash_attn_v3(get_inputs(128, torch.float32)[0], -1, True, 0.0)
+    assert not flash_attn._use_flash_attn_v3(q, -1, True, 30.0)
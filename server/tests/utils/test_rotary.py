@@ -0,0 +1,118 @@
+import math
+
+import pytest
+import torch
+
+rotary_emb = pytest.importorskip("rotary_emb")
+
+from lorax_server.utils import layers  # noqa: E402
+from lorax_server.utils.layers import YarnPositionRotaryEmbedding  # noqa: E402
+
+requires_triton_rotary = pytest.mark.skipif(
+    not layers._USE_TRITON_ROTARY, reason="Triton rotary requires flash_attn and a CUDA device with sm80+"
+)
+
+
+def yarn_ref_impl(
+    dim: int,
+    base: float,
+    scale: float,
+    original_max_position_embeddings: int,
+    extrapolation_factor: float = 1,
+    attn_factor: float = 1,
+    beta_fast: int = 32,
+    beta_slow: int = 1,
+):
+    # Reference: https://github.com/jquesnelle/yarn/blob/master/scaled_rope/LlamaYaRNScaledRotaryEmbedding.py
+    def correction_dim(num_rotations):
+        return (dim * math.log(original_max_position_embeddings / (num_rotations * 2 * math.pi))) / (2 * math.log(base))
+
+    low = max(math.floor(correction_dim(beta_fast)), 0)
+    high = min(math.ceil(correction_dim(beta_slow)), dim - 1)
+    if low == high:
+        high += 0.001
+    ramp = torch.clamp((torch.arange(dim // 2, dtype=torch.float32) - low) / (high - low), 0, 1)
+
+    pos_freqs = base ** (torch.arange(0, dim, 2).float() / dim)
+    inv_freq_extrapolation = 1.0 / pos_freqs
+    inv_freq_interpolation = 1.0 / (scale * pos_freqs)
+    inv_freq_mask = (1 - ramp) * extrapolation_factor
+    inv_freq = inv_freq_interpolation * (1 - inv_freq_mask) + inv_freq_extrapolation * inv_freq_mask
+
+    mscale = (0.1 * math.log(scale) + 1.0) if scale > 1 else 1.0
+    return inv_freq, mscale * attn_factor
+
+
+@pytest.mark.parametrize("factor", [1.0, 4.0])
+def test_yarn_frequencies(factor: float):
+    dim, base, max_position_embeddings, original_max_position_embeddings = 64, 10000, 4096, 1024
+    rotary = YarnPositionRotaryEmbedding(
+        dim=dim,
+        max_position_embeddings=max_position_embeddings,
+        base=base,
+        factor=factor,
+        original_max_position_embeddings=original_max_position_embeddings,
+        device=torch.device("cpu"),
+        dtype=torch.float32,
+    )
+
+    ref_inv_freq, ref_mscale = yarn_ref_impl(dim, base, factor, original_max_position_embeddings)
+    assert torch.allclose(rotary.inv_freq, ref_inv_freq)
+    assert rotary.mscale == pytest.approx(ref_mscale)
+
+    t = torch.arange(max_position_embeddings, dtype=torch.float32)
+    freqs = torch.outer(t, ref_inv_freq)
+    assert torch.allclose(rotary._cos_cached.squeeze(1), torch.cos(freqs) * ref_mscale, atol=1e-4)
+    assert torch.allclose(rotary._sin_cached.squeeze(1), torch.sin(freqs) * ref_mscale, atol=1e-4)
+
+
+def rotary_emb_ref_impl(x: torch.Tensor, cos: torch.Tensor, sin: torch.Tensor):
+    rotary_dim = cos.shape[-1]
+    x1 = x[..., :rotary_dim]
+    x2 = x[..., rotary_dim : 2 * rotary_dim]
+    rotary_emb.apply_rotary(x1, x2, cos, sin, x1, x2, False)
+
+
+# Packed projection shapes and the views the model files rotate in place, for 16 tokens and head size 64
+ROTARY_LAYOUTS = {
+    # query in most models: [tokens, heads, head_size]
+    "query": ((16, 8, 64), [lambda x: x]),
+    # key in most models: torch.select(kv, dim=1, index=0) of [tokens, 2, kv_heads, head_size]
+    "kv": ((16, 2, 4, 64), [lambda kv: torch.select(kv, dim=1, index=0)]),
+    # falcon key: torch.select(kv, dim=2, index=0) of [tokens, groups, 2, head_size]
+    "rw-kv": ((16, 2, 2, 64), [lambda kv: torch.select(kv, dim=2, index=0)]),
+    # gpt-neox query and key: qkv[:, 0] and qkv[:, 1] of [tokens, 3, heads, head_size]
+    "neox-qkv": ((16, 3, 8, 64), [lambda qkv: qkv[:, 0], lambda qkv: qkv[:, 1]]),
+}
+
+
+@requires_triton_rotary
+@pytest.mark.parametrize("layout", list(ROTARY_LAYOUTS))
+@pytest.mark.parametrize("rotary_dim", [64, 16])
+@pytest.mark.parametrize("contiguous_cos_sin", [True, False])
+@pytest.mark.parametrize("dtype,atol", [(torch.float16, 1e-3), (torch.bfloat16, 1e-2)])
+def test_triton_rotary_matches_rotary_emb(
+    layout: str, rotary_dim: int, contiguous_cos_sin: bool, dtype: torch.dtype, atol: float
+):
+    torch.manual_seed(0)
+    shape, views = ROTARY_LAYOUTS[layout]
+    inv_freq = layers._create_inv_freq(rotary_dim, 10000, "cuda")
+    rotary = layers.PositionRotaryEmbedding(inv_freq, None, 64, "cuda", dtype)
+
+    # Two sequences of 5 and 11 tokens, as in a packed prefill batch
+    position_ids = torch.cat([torch.arange(5), torch.arange(11)]).to("cuda")
+    cos, sin = rotary.get_cos_sin(position_ids, 11, dtype)
+    if not contiguous_cos_sin:
+        cos_sin = torch.cat([cos, sin], dim=-1)
+        cos, sin = cos_sin[..., : rotary_dim // 2], cos_sin[..., rotary_dim // 2 :]
+        assert not cos.squeeze(1).is_contiguous()
+
+    packed = torch.randn(shape, dtype=dtype, device="cuda")
+    out = packed.clone()
+    ref = packed.clone()
+    for view in views:
+        rotary(view(out), cos, sin)
+        rotary_emb_ref_impl(view(ref), cos, sin)
+
+    # Compare the packed tensors so the values outside the rotated views are checked as well
+    torch.testing.assert_close(out, ref, atol=atol, rtol=atol)
@@ -1,5 +1,10 @@
+import sys
+import types
+
 import pytest
 import torch
+from safetensors import safe_open
+from safetensors.torch import save_file
 from transformers.models.qwen2 import Qwen2Config
 
 from lorax_server.utils.dist import initialize_torch_distributed
@@ -7,7 +12,7 @@ from lorax_server.utils.sources.hub import (
     download_weights,
     weight_hub_files,
 )
-from lorax_server.utils.weights import Weights
+from lorax_server.utils.weights import GdsReader, Weights
 
 
 @pytest.mark.parametrize(
@@ -76,3 +81,54 @@ def test_get_multi_weights_row(model_id, prefix):
         assert weight_scale.dtype == torch.float
     else:
         assert weight.dtype == torch.bfloat16
+
+
+class FakeCuFile:
+    """Stands in for `kvikio.CuFile`, reading through the host so the GDS reader can be tested on CPU."""
+
+    def __init__(self, filename, mode):
+        self.filename = filename
+        self.closed = False
+
+    def read(self, buffer, size, file_offset):
+        with open(self.filename, 'rb') as f:
+            f.seek(file_offset)
+            data = bytearray(f.read(size))
+        buffer.copy_(torch.frombuffer(data, dtype=torch.uint8))
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def gds_reader(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'kvikio', types.SimpleNamespace(CuFile=FakeCuFile))
+    with GdsReader(torch.device('cpu')) as reader:
+        yield reader
+
+
+def test_gds_reader_matches_safetensors(gds_reader, tmp_path):
+    filename = str(tmp_path / 'model.safetensors')
+    tensors = {
+        'fp16': torch.randn((4, 8), dtype=torch.float16),
+        'bf16': torch.randn((3,), dtype=torch.bfloat16),
+        'i64': torch.arange(6, dtype=torch.int64).view(2, 3),
+        'empty': torch.empty((0, 4), dtype=torch.float32),
+    }
+    save_file(tensors, filename)
+
+    with safe_open(filename, framework='pytorch') as f:
+        for name in tensors:
+            tensor = gds_reader.get_tensor(filename, name)
+            expected = f.get_tensor(name)
+            assert tensor.dtype == expected.dtype
+            torch.testing.assert_close(tensor, expected)
+
+    # Unknown dtypes are left to safe_open
+    gds_reader._get_header(filename)[1]['i64']['dtype'] = 'U64'
+    assert gds_reader.get_tensor(filename, 'i64') is None
+
+    handle = gds_reader._get_file(filename)
+    gds_reader.close()
+    assert handle.closed
+    assert not gds_reader._files